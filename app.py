@@ -1,24 +1,46 @@
+import io
 import os
 import json
+import asyncio
 import hashlib
 from collections import Counter
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional, Tuple, Union
 
+import httpx
+import orjson
 import streamlit as st
 from dotenv import load_dotenv
-from openai import OpenAI
+from openai import APIError, AsyncOpenAI, OpenAI
 
 # ============================================================
 #  Setup
 # ============================================================
 
+# Streamlit re-executes this whole script on every interaction, so
+# module-level code is per-rerun work. One-off work lives behind
+# st.cache_data / st.cache_resource; per-session state in st.session_state.
+
 load_dotenv()
 api_key = os.getenv("OPENAI_API_KEY")
 
 if not api_key:
     raise RuntimeError("OPENAI_API_KEY not found. Set it in a .env file or your environment.")
 
-client = OpenAI(api_key=api_key)
+HTTP_LIMITS = httpx.Limits(max_keepalive_connections=32)
+
+
+@st.cache_resource(show_spinner=False)
+def get_openai_client() -> OpenAI:
+    """
+    One OpenAI client (and HTTP/2 connection pool) shared by every session
+    on this server, so reruns and new sessions skip TLS and pool setup.
+    """
+    return OpenAI(api_key=api_key, http_client=httpx.Client(http2=True, limits=HTTP_LIMITS))
+
+
+client = get_openai_client()
+
+MODEL_NAME = "gpt-4.1-mini"
 
 st.set_page_config(
     page_title="Ask-AI Support Coach Demo",
@@ -65,38 +87,72 @@ MOCK_ZENDESK_TICKET = {
 }
 
 
+class Comment(NamedTuple):
+    """
+    A ticket comment with its role and body already stripped.
+    """
+
+    author_role: str
+    body: str
+
+
+def to_comment(raw_comment: Union[dict, Comment]) -> Comment:
+    """
+    Normalize a Zendesk comment dict into a Comment (Comments pass through).
+    """
+    if isinstance(raw_comment, Comment):
+        return raw_comment
+    author_role = raw_comment.get("author_role", "unknown").strip() or "unknown"
+    return Comment(author_role, raw_comment.get("body", "").strip())
+
+
+def _format_comment(comment: Comment) -> str:
+    return f"{comment.author_role.capitalize()}: {comment.body}"
+
+
 def normalize_zendesk_ticket(zendesk_payload: dict) -> str:
     """
     Take a Zendesk-style ticket JSON and turn it into the plain-text
     transcript we feed into the QA evaluator.
+    `comments` may hold raw Zendesk dicts or pre-built Comment tuples.
     """
     subject = zendesk_payload.get("subject", "")
     comments = zendesk_payload.get("comments", [])
 
-    parts = []
+    buf = io.StringIO()
     if subject:
-        parts.append(f"Subject: {subject}")
+        buf.write(f"Subject: {subject}\n\n")
 
-    for c in comments:
-        author_role = c.get("author_role", "unknown").strip() or "unknown"
-        body = c.get("body", "").strip()
-        if not body:
+    for comment in map(to_comment, comments):
+        if not comment.body:
             continue
-        label = author_role.capitalize()
-        parts.append(f"{label}: {body}")
+        buf.write(_format_comment(comment))
+        buf.write("\n\n")
 
-    return "\n\n".join(parts)
+    # Drop the separator written after the last part.
+    return buf.getvalue()[:-2]
+
+
+@st.cache_data(show_spinner=False)
+def mock_zendesk_strings() -> Tuple[str, str]:
+    """
+    The mock payload as pretty-printed JSON and as a normalized transcript.
+    """
+    payload_json = json.dumps(MOCK_ZENDESK_TICKET, indent=2)
+    comments = tuple(map(to_comment, MOCK_ZENDESK_TICKET["comments"]))
+    normalized = normalize_zendesk_ticket(
+        {"subject": MOCK_ZENDESK_TICKET["subject"], "comments": comments}
+    )
+    return payload_json, normalized
 
 
 # ============================================================
 #  Core model prompts
 # ============================================================
 
-def build_qa_prompt(ticket_text: str) -> str:
-    """
-    Build the core instructions for the QA coaching agent.
-    """
-    return f"""
+# The rubric is static, so it lives in one constant: every evaluation shares
+# an identical prompt prefix, which OpenAI's automatic prompt caching rewards.
+_QA_PROMPT_PREFIX = """
 You are a senior support QA coach.
 
 You will be given the full text of a customer support ticket, including:
@@ -148,55 +204,159 @@ Use these decision rules:
 
 Return STRICTLY valid JSON in this format:
 
-{{
-  "criteria": {{
-    "technical_accuracy": {{
+{
+  "criteria": {
+    "technical_accuracy": {
       "score": <integer 1-5>,
-      "justification": "<short explanation>"
-    }},
-    "clarity_and_tone": {{
+      "justification": "<short explanation, ≤20 words>"
+    },
+    "clarity_and_tone": {
       "score": <integer 1-5>,
-      "justification": "<short explanation>"
-    }},
-    "diagnostic_depth": {{
+      "justification": "<short explanation, ≤20 words>"
+    },
+    "diagnostic_depth": {
       "score": <integer 1-5>,
-      "justification": "<short explanation>"
-    }},
-    "ownership_and_follow_through": {{
+      "justification": "<short explanation, ≤20 words>"
+    },
+    "ownership_and_follow_through": {
       "score": <integer 1-5>,
-      "justification": "<short explanation>"
-    }},
-    "escalation_judgment": {{
+      "justification": "<short explanation, ≤20 words>"
+    },
+    "escalation_judgment": {
       "score": <integer 1-5>,
-      "justification": "<short explanation>"
-    }}
-  }},
-  "overall_rating": {{
+      "justification": "<short explanation, ≤20 words>"
+    }
+  },
+  "overall_rating": {
     "score": <integer 1-5>,
     "justification": "<2–3 sentences summarizing overall performance>"
-  }},
-  "root_cause": {{
+  },
+  "root_cause": {
     "label": "agent_performance" | "content_gap" | "mixed",
     "explanation": "<1–3 sentences explaining why>",
     "kb_article_suggestion": "<if content_gap or mixed, suggest a KB article title and outline; otherwise use an empty string>"
-  }},
+  },
   "coaching_summary": "<3–6 bullet-style coaching points, in plain text>"
-}}
+}
 
 Ticket:
-\"\"\"{ticket_text}\"\"\"
-"""
+\"\"\""""
+_QA_PROMPT_SUFFIX = '"""\n'
 
 
-def evaluate_ticket(ticket_text: str) -> Dict[str, Any]:
+def build_qa_prompt(ticket_text: str) -> str:
     """
-    Call OpenAI to evaluate the ticket and return parsed JSON.
+    Build the core instructions for the QA coaching agent.
     """
-    prompt = build_qa_prompt(ticket_text)
+    return "".join((_QA_PROMPT_PREFIX, ticket_text, _QA_PROMPT_SUFFIX))
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
+
+def _scored_field(justification: str) -> Dict[str, Any]:
+    """
+    JSON schema for a {"score": 1-5, "justification": "..."} object.
+    """
+    return {
+        "type": "object",
+        "properties": {
+            "score": {"type": "integer", "enum": [1, 2, 3, 4, 5]},
+            "justification": {"type": "string", "description": justification},
+        },
+        "required": ["score", "justification"],
+        "additionalProperties": False,
+    }
+
+
+QA_CRITERIA = (
+    "technical_accuracy",
+    "clarity_and_tone",
+    "diagnostic_depth",
+    "ownership_and_follow_through",
+    "escalation_judgment",
+)
+
+# Mirrors the JSON format spelled out in build_qa_prompt(); strict mode makes
+# the API guarantee a parseable object that matches it.
+QA_EVAL_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {
+        "name": "qa_eval",
+        "strict": True,
+        "schema": {
+            "type": "object",
+            "properties": {
+                "criteria": {
+                    "type": "object",
+                    "properties": {
+                        name: _scored_field("Short explanation, ≤20 words") for name in QA_CRITERIA
+                    },
+                    "required": list(QA_CRITERIA),
+                    "additionalProperties": False,
+                },
+                "overall_rating": _scored_field(
+                    "2–3 sentences summarizing overall performance"
+                ),
+                "root_cause": {
+                    "type": "object",
+                    "properties": {
+                        "label": {
+                            "type": "string",
+                            "enum": ["agent_performance", "content_gap", "mixed"],
+                        },
+                        "explanation": {"type": "string"},
+                        "kb_article_suggestion": {"type": "string"},
+                    },
+                    "required": ["label", "explanation", "kb_article_suggestion"],
+                    "additionalProperties": False,
+                },
+                "coaching_summary": {"type": "string"},
+            },
+            "required": ["criteria", "overall_rating", "root_cause", "coaching_summary"],
+            "additionalProperties": False,
+        },
+    },
+}
+
+
+class EvaluationParseError(ValueError):
+    """
+    Raised when the evaluator's output cannot be parsed as JSON.
+    """
+
+    def __init__(self, message: str, raw_output: str):
+        super().__init__(message)
+        self.raw_output = raw_output
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def ticket_key(ticket_text: str) -> str:
+    """
+    Content hash of a ticket, used to key caches and de-duplicate history.
+    Sample tickets use precomputed digests; ad-hoc tickets are hashed once
+    and memoized for as long as the text stays unchanged.
+    """
+    sample_key = sample_ticket_keys().get(ticket_text)
+    if sample_key:
+        return sample_key
+
+    memo = st.session_state.get("ticket_key_memo")
+    if memo and memo[0] == ticket_text:
+        return memo[1]
+
+    key = _sha256(ticket_text)
+    st.session_state["ticket_key_memo"] = (ticket_text, key)
+    return key
+
+
+def _qa_request(ticket_text: str, model: str, temperature: float) -> Dict[str, Any]:
+    """
+    Keyword arguments for the evaluator's chat completion call.
+    """
+    return {
+        "model": model,
+        "messages": [
             {
                 "role": "system",
                 "content": (
@@ -204,32 +364,155 @@ def evaluate_ticket(ticket_text: str) -> Dict[str, Any]:
                     "Always return strictly valid JSON as requested."
                 ),
             },
-            {"role": "user", "content": prompt},
+            {"role": "user", "content": build_qa_prompt(ticket_text)},
         ],
-        temperature=0.2,
-    )
+        "temperature": temperature,
+        # The schema needs well under 900 tokens; the cap keeps decoding time bounded.
+        "max_tokens": 900,
+        "response_format": QA_EVAL_RESPONSE_FORMAT,
+    }
 
-    raw_content = response.choices[0].message.content or ""
 
-    # Try to parse JSON safely (strip ```json fences if present)
+def _parse_evaluation(raw_content: str) -> Dict[str, Any]:
+    """
+    Parse the evaluator's JSON output, raising EvaluationParseError on failure.
+    """
+    # The schema guarantees valid JSON; this only trips on refusals or truncation.
     try:
-        cleaned = raw_content.strip()
-        if cleaned.startswith("```"):
-            cleaned = cleaned.strip("`")
-            if cleaned.lower().startswith("json"):
-                cleaned = cleaned[4:].strip()
-        data = json.loads(cleaned)
-        return data
-    except Exception as e:
-        return {"error": f"Failed to parse model output as JSON: {e}", "raw_output": raw_content}
+        return orjson.loads(raw_content)
+    except orjson.JSONDecodeError as e:
+        raise EvaluationParseError(f"Failed to parse model output as JSON: {e}", raw_content) from e
 
 
-def generate_kb_article(ticket_text: str, kb_suggestion: str) -> str:
+@st.cache_data(ttl=3600, show_spinner=False)
+def _evaluate_ticket_cached(
+    ticket_text_hash: str, _ticket_text: str, model: str, temperature: float
+) -> Dict[str, Any]:
     """
-    Given a ticket and a KB article suggestion, ask the model to write
-    a full draft knowledge base article to close the content gap.
+    Cached evaluator call. Streamlit skips hashing `_ticket_text`, so the
+    cache is keyed on the ticket hash. Parse failures raise instead of
+    returning, so a bad completion is never memoized.
+    """
+    response = client.chat.completions.create(**_qa_request(_ticket_text, model, temperature))
+    return _parse_evaluation(response.choices[0].message.content or "")
+
+
+def evaluate_ticket(ticket_text: str) -> Dict[str, Any]:
     """
-    prompt = f"""
+    Call OpenAI to evaluate the ticket and return parsed JSON.
+    """
+    try:
+        return _evaluate_ticket_cached(ticket_key(ticket_text), ticket_text, MODEL_NAME, 0.2)
+    except EvaluationParseError as e:
+        return {"error": str(e), "raw_output": e.raw_output}
+
+
+async def _aevaluate_ticket(aclient: AsyncOpenAI, ticket_text: str) -> Dict[str, Any]:
+    """
+    Async variant of evaluate_ticket() for fan-out over several tickets.
+    API failures come back as error dicts so one bad call cannot discard
+    the rest of the gather.
+    """
+    try:
+        response = await aclient.chat.completions.create(
+            **_qa_request(ticket_text, MODEL_NAME, 0.2)
+        )
+    except APIError as e:
+        return {"error": f"OpenAI request failed: {e}", "raw_output": ""}
+    try:
+        return _parse_evaluation(response.choices[0].message.content or "")
+    except EvaluationParseError as e:
+        return {"error": str(e), "raw_output": e.raw_output}
+
+
+async def _aevaluate_tickets(ticket_texts: List[str]) -> List[Dict[str, Any]]:
+    # The async client is bound to the event loop, so it lives only as long
+    # as this asyncio.run() call. HTTP/2 lets the concurrent requests share
+    # one multiplexed connection.
+    http_client = httpx.AsyncClient(http2=True, limits=HTTP_LIMITS)
+    async with AsyncOpenAI(api_key=api_key, http_client=http_client) as aclient:
+        return list(await asyncio.gather(*(_aevaluate_ticket(aclient, t) for t in ticket_texts)))
+
+
+def evaluate_tickets(ticket_texts: List[str]) -> List[Dict[str, Any]]:
+    """
+    Evaluate several tickets concurrently. Wall-clock time is roughly that
+    of the slowest call rather than the sum of all of them.
+    """
+    return asyncio.run(_aevaluate_tickets(ticket_texts))
+
+
+def submit_bulk_evaluation(ticket_texts: List[str]) -> str:
+    """
+    Queue tickets on the OpenAI Batch API, which bills at half the
+    interactive rate and does not count against live rate limits.
+    Each request's custom_id is the ticket key. Returns the batch id.
+    """
+    lines = [
+        orjson.dumps(
+            {
+                "custom_id": ticket_key(text),
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": _qa_request(text, MODEL_NAME, 0.2),
+            }
+        )
+        for text in ticket_texts
+    ]
+    batch_file = client.files.create(
+        file=("qa_eval_batch.jsonl", b"\n".join(lines)),
+        purpose="batch",
+    )
+    batch = client.batches.create(
+        input_file_id=batch_file.id,
+        endpoint="/v1/chat/completions",
+        completion_window="24h",
+    )
+    return batch.id
+
+
+def fetch_bulk_evaluation(batch_id: str) -> Tuple[str, Optional[Dict[str, Dict[str, Any]]]]:
+    """
+    Check on a submitted batch. Returns (status, results), where results is
+    None while the batch is still running and otherwise maps each ticket key
+    to its parsed evaluation (or an error dict).
+    """
+    batch = client.batches.retrieve(batch_id)
+    if batch.status in ("validating", "in_progress", "finalizing", "cancelling"):
+        return batch.status, None
+
+    # Successful requests land in the output file and failed ones in the
+    # error file; either may be missing.
+    results: Dict[str, Dict[str, Any]] = {}
+    for file_id in (batch.output_file_id, batch.error_file_id):
+        if file_id:
+            _read_batch_file(file_id, results)
+    return batch.status, results
+
+
+def _read_batch_file(file_id: str, results: Dict[str, Dict[str, Any]]) -> None:
+    """
+    Parse a batch output or error file into `results`, keyed by custom_id.
+    """
+    for line in client.files.content(file_id).text.splitlines():
+        if not line.strip():
+            continue
+        entry = orjson.loads(line)
+        response = entry.get("response") or {}
+        if entry.get("error") or response.get("status_code") != 200:
+            results[entry["custom_id"]] = {
+                "error": f"Batch request failed: {entry.get('error') or response.get('body')}",
+                "raw_output": "",
+            }
+            continue
+        raw_content = response["body"]["choices"][0]["message"]["content"] or ""
+        try:
+            results[entry["custom_id"]] = _parse_evaluation(raw_content)
+        except EvaluationParseError as e:
+            results[entry["custom_id"]] = {"error": str(e), "raw_output": e.raw_output}
+
+
+_KB_PROMPT_PREFIX = """
 You are a senior technical writer for a B2B SaaS support organization.
 
 You are given:
@@ -251,45 +534,12 @@ Requirements:
 Return only the article text, formatted in Markdown (no JSON).
 
 Suggested KB article idea:
-\"\"\"{kb_suggestion}\"\"\"
+\"\"\""""
+_KB_PROMPT_MIDDLE = '"""\n\nTicket:\n"""'
+_KB_PROMPT_SUFFIX = '"""\n'
 
-Ticket:
-\"\"\"{ticket_text}\"\"\"
-"""
-
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": "You are an excellent technical writer for support KB articles."},
-            {"role": "user", "content": prompt},
-        ],
-        temperature=0.4,
-    )
-
-    return response.choices[0].message.content or ""
-
-
-def generate_team_insights(coaching_items: List[Dict[str, str]]) -> str:
-    """
-    Aggregate multiple coaching summaries into a team-wide 'Coaching Canon',
-    with explicit focus on business / revenue impact.
-    """
-    lines = []
-    for item in coaching_items:
-        label = item.get("label", "Unnamed ticket")
-        root_cause = item.get("root_cause", "unknown")
-        overall = item.get("overall_score", "N/A")
-        summary = item.get("coaching_summary", "").strip()
-        lines.append(
-            f"- Ticket: {label}\n"
-            f"  - Root cause: {root_cause}\n"
-            f"  - Overall score: {overall}\n"
-            f"  - Coaching summary:\n    {summary}\n"
-        )
-
-    coaching_block = "\n\n".join(lines)
 
-    prompt = f"""
+_TEAM_INSIGHTS_PROMPT_PREFIX = """
 You are a Director of Support Enablement presenting to a VP of Support and a CRO.
 
 You will be given several ticket-level coaching summaries.
@@ -316,11 +566,64 @@ For each theme, explicitly connect to metrics such as:
 Return a concise, actionable document in Markdown.
 
 Coaching items:
-{coaching_block}
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4.1-mini",
+
+def _stream_completion(**kwargs: Any) -> Iterator[str]:
+    """
+    Stream a chat completion, yielding text deltas as they arrive.
+    """
+    stream = client.chat.completions.create(stream=True, **kwargs)
+    for chunk in stream:
+        if chunk.choices:
+            yield chunk.choices[0].delta.content or ""
+
+
+def generate_kb_article(ticket_text: str, kb_suggestion: str) -> Iterator[str]:
+    """
+    Given a ticket and a KB article suggestion, ask the model to write
+    a full draft knowledge base article to close the content gap.
+    Yields the Markdown article as it is generated.
+    """
+    prompt = "".join(
+        (_KB_PROMPT_PREFIX, kb_suggestion, _KB_PROMPT_MIDDLE, ticket_text, _KB_PROMPT_SUFFIX)
+    )
+
+    return _stream_completion(
+        model=MODEL_NAME,
+        messages=[
+            {"role": "system", "content": "You are an excellent technical writer for support KB articles."},
+            {"role": "user", "content": prompt},
+        ],
+        temperature=0.4,
+        max_tokens=1500,
+    )
+
+
+def format_coaching_item(item: Dict[str, str]) -> str:
+    """
+    Render one coaching history entry for the team-insights prompt.
+    Entries are normalized by record_coaching(), so every key is present.
+    """
+    return (
+        f"- Ticket: {item['label']}\n"
+        f"  - Root cause: {item['root_cause']}\n"
+        f"  - Overall score: {item['overall_score']}\n"
+        f"  - Coaching summary:\n    {item['coaching_summary']}\n"
+    )
+
+
+def generate_team_insights(coaching_block: str) -> Iterator[str]:
+    """
+    Aggregate multiple coaching summaries into a team-wide 'Coaching Canon',
+    with explicit focus on business / revenue impact.
+    `coaching_block` is the history rendered by format_coaching_item().
+    Yields the Markdown document as it is generated.
+    """
+    prompt = "".join((_TEAM_INSIGHTS_PROMPT_PREFIX, coaching_block, "\n"))
+
+    return _stream_completion(
+        model=MODEL_NAME,
         messages=[
             {"role": "system", "content": "You are a seasoned Director of Support Enablement."},
             {"role": "user", "content": prompt},
@@ -328,7 +631,44 @@ Coaching items:
         temperature=0.4,
     )
 
-    return response.choices[0].message.content or ""
+
+# ============================================================
+#  ROI math
+# ============================================================
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_roi(
+    monthly_tickets: int,
+    avg_cost_per_case: float,
+    current_deflection: int,
+    expected_deflection_uplift: int,
+    high_risk_tickets_per_month: int,
+    revenue_per_churned_account: float,
+    churn_prob_without: int,
+    churn_prob_with: int,
+) -> Dict[str, float]:
+    """
+    Annualized support savings and revenue preserved for the ROI sandbox.
+    Pure arithmetic on the widget values, memoized on those scalars.
+    """
+    annual_tickets = monthly_tickets * 12
+    current_handled_by_agents = annual_tickets * (1 - current_deflection / 100.0)
+    new_deflection = min(current_deflection + expected_deflection_uplift, 100)
+    future_handled_by_agents = annual_tickets * (1 - new_deflection / 100.0)
+    delta_cases = max(current_handled_by_agents - future_handled_by_agents, 0)
+    annual_support_savings = delta_cases * avg_cost_per_case
+
+    annual_high_risk_tickets = high_risk_tickets_per_month * 12
+    expected_churn_without = annual_high_risk_tickets * (churn_prob_without / 100.0)
+    expected_churn_with = annual_high_risk_tickets * (churn_prob_with / 100.0)
+    avoided_churn_accounts = max(expected_churn_without - expected_churn_with, 0)
+    annual_revenue_preserved = avoided_churn_accounts * revenue_per_churned_account
+
+    return {
+        "savings": annual_support_savings,
+        "preserved": annual_revenue_preserved,
+        "total": annual_support_savings + annual_revenue_preserved,
+    }
 
 
 # ============================================================
@@ -450,295 +790,483 @@ SAMPLE_TICKETS = {
     "Strong agent – Security lock, good handling": SAMPLE_STRONG_AGENT,
 }
 
+
+@st.cache_resource(show_spinner=False)
+def sample_ticket_keys() -> Dict[str, str]:
+    """
+    SHA-256 keys for the static sample tickets, indexed by ticket text.
+    """
+    return {text: _sha256(text) for text in SAMPLE_TICKETS.values()}
+
+
 # ============================================================
 #  Session state
 # ============================================================
 
-if "ticket_text" not in st.session_state:
-    st.session_state["ticket_text"] = DEFAULT_EXAMPLE
+_SESSION_DEFAULTS = {
+    "ticket_text": DEFAULT_EXAMPLE,
+    "last_result": None,
+    "last_ticket_text": "",
+    "last_ticket_hash": "",
+    "kb_draft": "",
+    "coaching_history": [],
+    "coaching_block_cached": "",
+    "coaching_block_len": 0,
+    "coaching_keys": set(),
+    "root_cause_counts": Counter(),
+    "team_insights": "",
+    "current_ticket_label": "Assignment example – SecureVault / Okta / SOC2",
+    "bulk_batch": None,
+    "last_result_json": None,
+    "evaluated_results": {},
+    "step3_notice": "",
+}
+
+for key, default in _SESSION_DEFAULTS.items():
+    st.session_state.setdefault(key, default)
+
+
+def record_coaching(ticket_text: str, label: str, result: Dict[str, Any]) -> bool:
+    """
+    Append a successful evaluation to the session's coaching history,
+    skipping tickets that were already recorded. The result is also kept
+    in `evaluated_results`, so Step 1 can reuse evaluations made by the
+    concurrent and batch paths, which bypass the st.cache_data cache.
+    Returns True if a new history entry was appended.
+    """
+    if "error" in result:
+        return False
+
+    key = ticket_key(ticket_text)
+    st.session_state["evaluated_results"][key] = result
 
-if "last_result" not in st.session_state:
-    st.session_state["last_result"] = None
+    coaching = (result.get("coaching_summary") or "").strip()
+    if not coaching:
+        return False
 
-if "last_ticket_text" not in st.session_state:
-    st.session_state["last_ticket_text"] = ""
+    if key in st.session_state["coaching_keys"]:
+        return False
 
-if "kb_draft" not in st.session_state:
-    st.session_state["kb_draft"] = ""
+    # Normalize once here so readers (the root-cause tally, the Canon prompt)
+    # never need per-item defaults.
+    root = result.get("root_cause", {}) or {}
+    overall = result.get("overall_rating", {}) or {}
+    item = {
+        "label": label or "Unnamed ticket",
+        "overall_score": overall.get("score") or "N/A",
+        "root_cause": root.get("label") or "unknown",
+        "coaching_summary": coaching,
+    }
+    st.session_state["coaching_keys"].add(key)
+    st.session_state["root_cause_counts"][item["root_cause"]] += 1
+    st.session_state["coaching_history"].append(item)
+    return True
+
+
+def pending_sample_tickets() -> Dict[str, Tuple[str, str]]:
+    """
+    Sample tickets not yet in the coaching history, as key -> (label, text).
+    """
+    return {
+        key: (label, text)
+        for label, text in SAMPLE_TICKETS.items()
+        if (key := ticket_key(text)) not in st.session_state["coaching_keys"]
+    }
 
-if "coaching_history" not in st.session_state:
-    st.session_state["coaching_history"] = []
 
-if "coaching_keys" not in st.session_state:
-    st.session_state["coaching_keys"] = []
+def coaching_block() -> str:
+    """
+    The coaching history formatted for generate_team_insights(). Only items
+    appended since the last call are formatted; the rest is reused.
+    """
+    history = st.session_state["coaching_history"]
+    done = st.session_state["coaching_block_len"]
+    if done < len(history):
+        new_block = "\n\n".join(format_coaching_item(item) for item in history[done:])
+        cached = st.session_state["coaching_block_cached"]
+        st.session_state["coaching_block_cached"] = f"{cached}\n\n{new_block}" if cached else new_block
+        st.session_state["coaching_block_len"] = len(history)
+    return st.session_state["coaching_block_cached"]
 
-if "team_insights" not in st.session_state:
-    st.session_state["team_insights"] = ""
 
-if "current_ticket_label" not in st.session_state:
-    st.session_state["current_ticket_label"] = "Assignment example – SecureVault / Okta / SOC2"
+def result_json(result: Dict[str, Any]) -> str:
+    """
+    Pretty-printed JSON for the appendix. The string is cached next to the
+    result object it was built from; identity is checked with `is` on the
+    held reference, so a recycled id() can never return a stale dump.
+    """
+    cached = st.session_state["last_result_json"]
+    if cached and cached[0] is result:
+        return cached[1]
+    dumped = json.dumps(result, indent=2)
+    st.session_state["last_result_json"] = (result, dumped)
+    return dumped
+
 
 # ============================================================
 #  Sidebar
 # ============================================================
 
+# Static sidebar content goes out as a single element per rerun.
+_SIDEBAR_MD = f"""\
+### What this demo shows
+
+- **Step 1:** Coach a single ticket like a QA lead
+- **Step 2:** Automatically close content gaps with KB drafts
+- **Step 3:** Roll up coaching into org-wide themes
+- **Step 4:** Tie gains to hard dollars (deflection & churn)
+
+---
+
+Models: `{MODEL_NAME}`
+
+---
+
+:gray[Dark theme is controlled via `.streamlit/config.toml` – set `base = "dark"` there for default dark mode.]
+
+---
+
+### Bulk evaluation
+
+:gray[Queues every sample ticket on the OpenAI Batch API at half the cost. Batches can take a few minutes; check back for results.]
+"""
+
 with st.sidebar:
-    st.subheader("What this demo shows")
-    st.write(
-        "- **Step 1:** Coach a single ticket like a QA lead\n"
-        "- **Step 2:** Automatically close content gaps with KB drafts\n"
-        "- **Step 3:** Roll up coaching into org-wide themes\n"
-        "- **Step 4:** Tie gains to hard dollars (deflection & churn)\n"
-    )
-    st.markdown("---")
-    st.write("Models: `gpt-4.1-mini`")
-    st.markdown("---")
-    st.caption(
-        "Dark theme is controlled via `.streamlit/config.toml` – "
-        "set `base = \"dark\"` there for default dark mode."
-    )
+    st.markdown(_SIDEBAR_MD)
+    if st.button("Run batch on all sample tickets", key="btn_batch_submit"):
+        pending = pending_sample_tickets()
+        if pending:
+            batch_id = submit_bulk_evaluation([text for _, text in pending.values()])
+            st.session_state["bulk_batch"] = {"id": batch_id, "tickets": pending}
+        else:
+            st.info("All sample tickets are already in the coaching history.")
+
+    bulk_batch = st.session_state.get("bulk_batch")
+    if bulk_batch:
+        st.caption(f"Batch `{bulk_batch['id']}` submitted.")
+        if st.button("Check batch status", key="btn_batch_check"):
+            status, batch_results = fetch_bulk_evaluation(bulk_batch["id"])
+            if batch_results is None:
+                st.info(f"Batch is still running (status: `{status}`).")
+            elif not batch_results:
+                st.error(f"Batch finished without results (status: `{status}`).")
+                st.session_state["bulk_batch"] = None
+            else:
+                recorded = 0
+                failed = []
+                for key, (label, text) in bulk_batch["tickets"].items():
+                    batch_result = batch_results.get(key)
+                    if batch_result is None or "error" in batch_result:
+                        failed.append(label)
+                    elif record_coaching(text, label, batch_result):
+                        recorded += 1
+                st.session_state["bulk_batch"] = None
+                st.session_state["team_insights"] = ""
+                st.success(f"Recorded {recorded} new batch evaluations.")
+                if failed:
+                    st.warning(f"{len(failed)} ticket(s) failed in the batch: {', '.join(failed)}")
 
 # ============================================================
 #  Header
 # ============================================================
 
-st.title("Ask-AI Support Coach Demo")
-st.caption(
-    "From a single messy ticket → to coaching, content gaps, team-wide patterns and a back-of-the-envelope ROI."
-)
-st.markdown("---")
+_HEADER_MD = """\
+# Ask-AI Support Coach Demo
+
+:gray[From a single messy ticket → to coaching, content gaps, team-wide patterns and a back-of-the-envelope ROI.]
+
+---
+"""
+
+st.markdown(_HEADER_MD)
+
 
 # ============================================================
 #  STEP 1 — Coach a single ticket
 # ============================================================
 
-st.markdown("## 1️⃣ Coach a single ticket")
-
-st.markdown(
-    "Drop in a real ticket (or load a sample). The agent is scored on five dimensions, "
-    "and the system explains **what went wrong and why**."
-)
+@st.fragment
+def step1_ui() -> None:
+    """
+    Step 1 UI. As a fragment, editing the ticket reruns only this step;
+    loading a sample or a new evaluation triggers a full app rerun.
+    """
+    st.markdown("## 1️⃣ Coach a single ticket")
 
-col_samples, _ = st.columns([2, 1])
-with col_samples:
-    sample_choice = st.selectbox(
-        "Load a sample ticket (optional)",
-        ["None"] + list(SAMPLE_TICKETS.keys()),
+    st.markdown(
+        "Drop in a real ticket (or load a sample). The agent is scored on five dimensions, "
+        "and the system explains **what went wrong and why**."
     )
 
-if st.button("Load selected sample"):
-    if sample_choice != "None":
-        st.session_state["ticket_text"] = SAMPLE_TICKETS[sample_choice]
-        st.session_state["last_result"] = None
-        st.session_state["kb_draft"] = ""
-        st.session_state["current_ticket_label"] = sample_choice
-        st.session_state["last_ticket_text"] = SAMPLE_TICKETS[sample_choice]
-
-ticket_text = st.text_area(
-    "Ticket transcript",
-    key="ticket_text",
-    height=260,
-    help="Include subject + customer + agent messages. The more context, the better.",
-)
-
-col_run, _ = st.columns([1, 3])
-with col_run:
-    run_eval = st.button("Evaluate agent performance", type="primary")
-
-if run_eval:
-    if not ticket_text.strip():
-        st.warning("Please paste a ticket before evaluating.")
-    else:
-        with st.spinner("Evaluating ticket like a QA lead..."):
-            result = evaluate_ticket(ticket_text)
+    col_samples, _ = st.columns([2, 1])
+    with col_samples:
+        sample_choice = st.selectbox(
+            "Load a sample ticket (optional)",
+            ["None"] + list(SAMPLE_TICKETS.keys()),
+        )
 
-        st.session_state["last_result"] = result
-        st.session_state["last_ticket_text"] = ticket_text
-        st.session_state["kb_draft"] = ""
-        st.session_state["team_insights"] = ""
+    if st.button("Load selected sample"):
+        if sample_choice != "None":
+            st.session_state["ticket_text"] = SAMPLE_TICKETS[sample_choice]
+            st.session_state["last_result"] = None
+            st.session_state["kb_draft"] = ""
+            st.session_state["current_ticket_label"] = sample_choice
+            st.session_state["last_ticket_text"] = SAMPLE_TICKETS[sample_choice]
+            st.rerun()
+
+    ticket_text = st.text_area(
+        "Ticket transcript",
+        key="ticket_text",
+        height=260,
+        help="Include subject + customer + agent messages. The more context, the better.",
+    )
 
-        if "error" not in result:
-            coaching = result.get("coaching_summary", "")
-            root = result.get("root_cause", {}) or {}
-            overall = result.get("overall_rating", {}) or {}
-            root_label = root.get("label", "unknown")
-            overall_score = overall.get("score", "N/A")
+    col_run, _ = st.columns([1, 3])
+    with col_run:
+        run_eval = st.button("Evaluate agent performance", type="primary")
 
-            if coaching:
-                ticket_key = hashlib.sha256(ticket_text.encode("utf-8")).hexdigest()
-                if ticket_key not in st.session_state["coaching_keys"]:
-                    st.session_state["coaching_keys"].append(ticket_key)
-                    st.session_state["coaching_history"].append(
-                        {
-                            "label": st.session_state.get("current_ticket_label", "Ad-hoc ticket"),
-                            "overall_score": overall_score,
-                            "root_cause": root_label,
-                            "coaching_summary": coaching,
-                        }
-                    )
+    if run_eval:
+        if not ticket_text.strip():
+            st.warning("Please paste a ticket before evaluating.")
+        else:
+            new_hash = ticket_key(ticket_text)
+            last_result = st.session_state.get("last_result")
+            if (
+                st.session_state.get("last_ticket_hash") == new_hash
+                and last_result
+                and "error" not in last_result
+            ):
+                # Same ticket, good result already on screen: keep it (and any KB draft).
+                st.toast("Reusing cached evaluation.")
+            else:
+                with st.spinner("Evaluating ticket like a QA lead..."):
+                    result = st.session_state["evaluated_results"].get(
+                        new_hash
+                    ) or evaluate_ticket(ticket_text)
+
+                st.session_state["last_result"] = result
+                st.session_state["last_ticket_text"] = ticket_text
+                st.session_state["last_ticket_hash"] = "" if "error" in result else new_hash
+                st.session_state["kb_draft"] = ""
+                st.session_state["team_insights"] = ""
+
+                record_coaching(
+                    ticket_text,
+                    st.session_state.get("current_ticket_label", "Ad-hoc ticket"),
+                    result,
+                )
+                # Steps 2-4 read the new result, so refresh the whole app.
+                st.rerun()
 
-result = st.session_state.get("last_result")
+    result = st.session_state.get("last_result")
 
-if result is None:
-    st.info("Run an evaluation to see scores, root cause, and coaching.")
-else:
-    if "error" in result:
-        st.error(result["error"])
+    if result is None:
+        st.info("Run an evaluation to see scores, root cause, and coaching.")
     else:
-        criteria = result.get("criteria", {})
-        overall = result.get("overall_rating", {})
-        root = result.get("root_cause", {})
-        coaching = result.get("coaching_summary", "")
-
-        # Overall
-        st.markdown("### Overall rating")
-        overall_score = overall.get("score", "N/A")
-        overall_just = overall.get("justification", "")
-        st.markdown(f"**Score:** {overall_score} / 5")
-        if overall_just:
-            st.write(overall_just)
-
-        # Criteria
-        st.markdown("### Criteria breakdown")
-        if criteria:
-            bullets = []
-            for key, value in criteria.items():
-                score = value.get("score", "N/A")
-                just = value.get("justification", "")
-                label = key.replace("_", " ").title()
-                bullets.append(f"- **{label}** — {score}/5\n  {just}")
-            st.markdown("\n".join(bullets))
+        if "error" in result:
+            st.error(result["error"])
         else:
-            st.write("No criteria were returned by the model.")
-
-        # Root cause
-        st.markdown("### Root cause analysis")
-
-        root_label = root.get("label", "N/A")
-        explanation = root.get("explanation", "")
-        kb_suggestion = root.get("kb_article_suggestion", "")
+            criteria = result.get("criteria", {})
+            overall = result.get("overall_rating", {})
+            root = result.get("root_cause", {})
+            coaching = result.get("coaching_summary", "")
 
-        st.markdown(f"**Primary label:** `{root_label}`")
-        if explanation:
-            st.write(explanation)
-        if kb_suggestion:
-            st.markdown("**KB opportunity (short idea):**")
-            st.write(kb_suggestion)
+            # Overall
+            st.markdown("### Overall rating")
+            overall_score = overall.get("score", "N/A")
+            overall_just = overall.get("justification", "")
+            st.markdown(f"**Score:** {overall_score} / 5")
+            if overall_just:
+                st.write(overall_just)
+
+            # Criteria
+            st.markdown("### Criteria breakdown")
+            if criteria:
+                bullets = []
+                for key, value in criteria.items():
+                    score = value.get("score", "N/A")
+                    just = value.get("justification", "")
+                    label = key.replace("_", " ").title()
+                    bullets.append(f"- **{label}** — {score}/5\n  {just}")
+                st.markdown("\n".join(bullets))
+            else:
+                st.write("No criteria were returned by the model.")
+
+            # Root cause
+            st.markdown("### Root cause analysis")
+
+            root_label = root.get("label", "N/A")
+            explanation = root.get("explanation", "")
+            kb_suggestion = root.get("kb_article_suggestion", "")
+
+            st.markdown(f"**Primary label:** `{root_label}`")
+            if explanation:
+                st.write(explanation)
+            if kb_suggestion:
+                st.markdown("**KB opportunity (short idea):**")
+                st.write(kb_suggestion)
+
+            # Coaching summary
+            st.markdown("### Coaching summary (for team lead)")
+            st.write(coaching or "No coaching summary returned.")
+
+
+step1_ui()
 
-        # Coaching summary
-        st.markdown("### Coaching summary (for team lead)")
-        st.write(coaching or "No coaching summary returned.")
 
 # ============================================================
 #  STEP 2 — Close the loop on content gaps (KB drafting)
 # ============================================================
 
-st.markdown("---")
-st.markdown("## 2️⃣ Close the loop on content gaps")
-
-st.markdown(
-    "When the system detects a **content gap** (or mixed case), it can draft a KB article "
-    "so that the same question becomes self-serve instead of a ticket."
-)
+@st.fragment
+def step2_ui() -> None:
+    """
+    Step 2 UI. Drafting and editing a KB article reruns only this step.
+    """
+    st.markdown("---")
+    st.markdown("## 2️⃣ Close the loop on content gaps")
 
-if result and "error" not in result:
-    root = result.get("root_cause", {}) or {}
-    root_label = root.get("label", "")
-    kb_suggestion = root.get("kb_article_suggestion", "")
+    st.markdown(
+        "When the system detects a **content gap** (or mixed case), it can draft a KB article "
+        "so that the same question becomes self-serve instead of a ticket."
+    )
 
-    if kb_suggestion and root_label in ("content_gap", "mixed"):
-        st.success(
-            f"This ticket surfaced a **{root_label}** – there’s documentation to be written here."
-        )
+    result = st.session_state.get("last_result")
+    if result and "error" not in result:
+        root = result.get("root_cause", {}) or {}
+        root_label = root.get("label", "")
+        kb_suggestion = root.get("kb_article_suggestion", "")
 
-        if st.button("Generate KB article draft", key="btn_generate_kb"):
-            with st.spinner("Generating KB article draft..."):
-                kb_text = generate_kb_article(
-                    st.session_state.get("last_ticket_text", st.session_state["ticket_text"]),
-                    kb_suggestion,
-                )
-                st.session_state["kb_draft"] = kb_text
-
-        if st.session_state.get("kb_draft"):
-            with st.expander("Proposed KB article draft", expanded=True):
-                kb_text = st.text_area(
-                    "KB article draft (editable)",
-                    value=st.session_state["kb_draft"],
-                    key="kb_editor",
-                    height=280,
-                )
-                col_a, col_b, col_c = st.columns(3)
-                with col_a:
-                    if st.button("Approve"):
-                        st.success(
-                            "Approved. In production this would be pushed into your KB / help center."
-                        )
-                with col_b:
-                    if st.button("Mark for revision"):
-                        st.info("Marked for revision. A docs owner could refine this before publishing.")
-                with col_c:
-                    if st.button("Reject"):
-                        st.warning(
-                            "Rejected. This gap might need a different format (runbook, product change, etc.)."
+        if kb_suggestion and root_label in ("content_gap", "mixed"):
+            st.success(
+                f"This ticket surfaced a **{root_label}** – there’s documentation to be written here."
+            )
+
+            if st.button("Generate KB article draft", key="btn_generate_kb"):
+                # Stream the draft for fast first paint, then hand it to the editor below.
+                stream_area = st.empty()
+                with stream_area.container():
+                    st.session_state["kb_draft"] = st.write_stream(
+                        generate_kb_article(
+                            st.session_state.get("last_ticket_text", st.session_state["ticket_text"]),
+                            kb_suggestion,
                         )
+                    )
+                stream_area.empty()
+
+            if st.session_state.get("kb_draft"):
+                with st.expander("Proposed KB article draft", expanded=True):
+                    st.text_area(
+                        "KB article draft (editable)",
+                        value=st.session_state["kb_draft"],
+                        key="kb_editor",
+                        height=280,
+                    )
+                    col_a, col_b, col_c = st.columns(3)
+                    with col_a:
+                        if st.button("Approve"):
+                            st.success(
+                                "Approved. In production this would be pushed into your KB / help center."
+                            )
+                    with col_b:
+                        if st.button("Mark for revision"):
+                            st.info("Marked for revision. A docs owner could refine this before publishing.")
+                    with col_c:
+                        if st.button("Reject"):
+                            st.warning(
+                                "Rejected. This gap might need a different format (runbook, product change, etc.)."
+                            )
+        else:
+            st.caption(
+                "The last evaluated ticket was primarily an **agent-performance** issue. "
+                "No KB draft is suggested for this one."
+            )
     else:
-        st.caption(
-            "The last evaluated ticket was primarily an **agent-performance** issue. "
-            "No KB draft is suggested for this one."
-        )
-else:
-    st.caption("Run an evaluation first to see if any content gaps appear.")
+        st.caption("Run an evaluation first to see if any content gaps appear.")
+
+
+step2_ui()
+
 
 # ============================================================
 #  STEP 3 — Team-wide Coaching Canon
 # ============================================================
 
-st.markdown("---")
-st.markdown("## 3️⃣ Team-wide Coaching Canon")
-
-history = st.session_state.get("coaching_history", [])
-if not history:
-    st.write(
-        "As you run this on real tickets, each evaluation is logged here. "
-        "You can then roll them up into org-wide themes."
-    )
-else:
-    st.write(
-        f"{len(history)} unique ticket-level coaching summaries captured in this session."
-    )
-
-    root_counts = Counter(item.get("root_cause", "unknown") for item in history)
-    st.markdown("**Pattern snapshot**")
-    bullets = []
-    if root_counts.get("agent_performance"):
-        bullets.append(
-            f"- {root_counts['agent_performance']} cases are primarily **agent-performance** "
-            "(coaching and process issues)."
-        )
-    if root_counts.get("content_gap"):
-        bullets.append(
-            f"- {root_counts['content_gap']} cases are primarily **content-gaps** "
-            "(deflectable via better docs)."
-        )
-    if root_counts.get("mixed"):
-        bullets.append(
-            f"- {root_counts['mixed']} cases are **mixed** (both coaching and docs)."
+@st.fragment
+def step3_ui() -> None:
+    """
+    Step 3 UI. Generating the Canon reruns only this step.
+    """
+    st.markdown("---")
+    st.markdown("## 3️⃣ Team-wide Coaching Canon")
+
+    # Set before the full rerun that follows bulk evaluation.
+    if st.session_state["step3_notice"]:
+        st.warning(st.session_state["step3_notice"])
+        st.session_state["step3_notice"] = ""
+
+    if st.button("Evaluate all sample tickets", key="btn_eval_samples"):
+        pending = pending_sample_tickets()
+        if pending:
+            with st.spinner(f"Evaluating {len(pending)} sample tickets in parallel..."):
+                results = evaluate_tickets([text for _, text in pending.values()])
+            failed = []
+            for (label, text), sample_result in zip(pending.values(), results):
+                if "error" in sample_result:
+                    failed.append(label)
+                record_coaching(text, label, sample_result)
+            if failed:
+                st.session_state["step3_notice"] = (
+                    f"{len(failed)} sample ticket(s) failed to evaluate: {', '.join(failed)}"
+                )
+            st.session_state["team_insights"] = ""
+            # The ROI section reads the history too.
+            st.rerun()
+
+    history = st.session_state.get("coaching_history", [])
+    if not history:
+        st.write(
+            "As you run this on real tickets, each evaluation is logged here. "
+            "You can then roll them up into org-wide themes."
         )
-    if bullets:
-        st.markdown("\n".join(bullets))
-        st.caption(
-            "Content-gaps and mixed cases are where you unlock self-serve and deflection. "
-            "Agent-performance cases point to enablement and QA."
+    else:
+        st.write(
+            f"{len(history)} unique ticket-level coaching summaries captured in this session."
         )
 
-    if st.button("Generate team-wide coaching document", key="btn_team_insights"):
-        with st.spinner("Aggregating into a Coaching Canon..."):
-            insights = generate_team_insights(history)
-            st.session_state["team_insights"] = insights
+        root_counts = st.session_state["root_cause_counts"]
+        st.markdown("**Pattern snapshot**")
+        bullets = []
+        if root_counts.get("agent_performance"):
+            bullets.append(
+                f"- {root_counts['agent_performance']} cases are primarily **agent-performance** "
+                "(coaching and process issues)."
+            )
+        if root_counts.get("content_gap"):
+            bullets.append(
+                f"- {root_counts['content_gap']} cases are primarily **content-gaps** "
+                "(deflectable via better docs)."
+            )
+        if root_counts.get("mixed"):
+            bullets.append(
+                f"- {root_counts['mixed']} cases are **mixed** (both coaching and docs)."
+            )
+        if bullets:
+            st.markdown("\n".join(bullets))
+            st.caption(
+                "Content-gaps and mixed cases are where you unlock self-serve and deflection. "
+                "Agent-performance cases point to enablement and QA."
+            )
+
+        if st.button("Generate team-wide coaching document", key="btn_team_insights"):
+            with st.expander("Team-wide Coaching Canon", expanded=True):
+                st.session_state["team_insights"] = st.write_stream(generate_team_insights(coaching_block()))
+        elif st.session_state.get("team_insights"):
+            with st.expander("Team-wide Coaching Canon", expanded=True):
+                st.markdown(st.session_state["team_insights"])
 
-    if st.session_state.get("team_insights"):
-        with st.expander("Team-wide Coaching Canon", expanded=True):
-            st.markdown(st.session_state["team_insights"])
+
+step3_ui()
 
 # ============================================================
 #  STEP 4 — ROI / Business impact sandbox
@@ -752,80 +1280,80 @@ st.markdown(
     "to **support cost and churn**. Plug in your own numbers."
 )
 
-col_left, col_right = st.columns(2)
-
-with col_left:
-    monthly_tickets = st.number_input(
-        "Monthly ticket volume",
-        min_value=0,
-        value=800,
-        step=50,
-    )
-    avg_cost_per_case = st.number_input(
-        "Average fully-loaded cost per handled case ($)",
-        min_value=0.0,
-        value=35.0,
-        step=1.0,
-    )
-    current_deflection = st.slider(
-        "Current self-serve / deflection rate (%)",
-        min_value=0,
-        max_value=80,
-        value=20,
-        step=5,
-    )
-    expected_deflection_uplift = st.slider(
-        "Expected uplift in deflection with Ask-AI (%)",
-        min_value=0,
-        max_value=30,
-        value=5,
-        step=1,
-    )
-
-with col_right:
-    high_risk_tickets_per_month = st.number_input(
-        "High-risk / strategic tickets per month",
-        min_value=0,
-        value=20,
-        step=5,
-        help="Think SOC2 audits, CISO-level issues, large logos."
-    )
-    revenue_per_churned_account = st.number_input(
-        "Average annual revenue per strategic account ($)",
-        min_value=0.0,
-        value=50000.0,
-        step=5000.0,
-    )
-    churn_prob_without = st.slider(
-        "Churn probability on those tickets today (%)",
-        min_value=0,
-        max_value=50,
-        value=10,
-        step=1,
-    )
-    churn_prob_with = st.slider(
-        "Churn probability after better QA / docs (%)",
-        min_value=0,
-        max_value=50,
-        value=5,
-        step=1,
-    )
-
-# Calculations
-annual_tickets = monthly_tickets * 12
-current_handled_by_agents = annual_tickets * (1 - current_deflection / 100.0)
-new_deflection = min(current_deflection + expected_deflection_uplift, 100)
-future_handled_by_agents = annual_tickets * (1 - new_deflection / 100.0)
-delta_cases = max(current_handled_by_agents - future_handled_by_agents, 0)
-annual_support_savings = delta_cases * avg_cost_per_case
+# Inputs live in a form so the page reruns once per "Recalculate",
+# not on every keystroke or slider tick.
+with st.form("roi_form", clear_on_submit=False):
+    col_left, col_right = st.columns(2)
+
+    with col_left:
+        monthly_tickets = st.number_input(
+            "Monthly ticket volume",
+            min_value=0,
+            value=800,
+            step=50,
+        )
+        avg_cost_per_case = st.number_input(
+            "Average fully-loaded cost per handled case ($)",
+            min_value=0.0,
+            value=35.0,
+            step=1.0,
+        )
+        current_deflection = st.slider(
+            "Current self-serve / deflection rate (%)",
+            min_value=0,
+            max_value=80,
+            value=20,
+            step=5,
+        )
+        expected_deflection_uplift = st.slider(
+            "Expected uplift in deflection with Ask-AI (%)",
+            min_value=0,
+            max_value=30,
+            value=5,
+            step=1,
+        )
 
-annual_high_risk_tickets = high_risk_tickets_per_month * 12
-expected_churn_without = annual_high_risk_tickets * (churn_prob_without / 100.0)
-expected_churn_with = annual_high_risk_tickets * (churn_prob_with / 100.0)
-avoided_churn_accounts = max(expected_churn_without - expected_churn_with, 0)
-annual_revenue_preserved = avoided_churn_accounts * revenue_per_churned_account
+    with col_right:
+        high_risk_tickets_per_month = st.number_input(
+            "High-risk / strategic tickets per month",
+            min_value=0,
+            value=20,
+            step=5,
+            help="Think SOC2 audits, CISO-level issues, large logos."
+        )
+        revenue_per_churned_account = st.number_input(
+            "Average annual revenue per strategic account ($)",
+            min_value=0.0,
+            value=50000.0,
+            step=5000.0,
+        )
+        churn_prob_without = st.slider(
+            "Churn probability on those tickets today (%)",
+            min_value=0,
+            max_value=50,
+            value=10,
+            step=1,
+        )
+        churn_prob_with = st.slider(
+            "Churn probability after better QA / docs (%)",
+            min_value=0,
+            max_value=50,
+            value=5,
+            step=1,
+        )
 
-total_annual_impact = annual_support_savings + annual_revenue_preserved
+    st.form_submit_button("Recalculate")
+
+roi = compute_roi(
+    monthly_tickets,
+    avg_cost_per_case,
+    current_deflection,
+    expected_deflection_uplift,
+    high_risk_tickets_per_month,
+    revenue_per_churned_account,
+    churn_prob_without,
+    churn_prob_with,
+)
 
 st.markdown("### Headline impact (annualized)")
 
@@ -833,33 +1361,31 @@ col_a, col_b, col_c = st.columns(3)
 with col_a:
     st.metric(
         "Support cost savings (est.)",
-        f"${annual_support_savings:,.0f}",
+        f"${roi['savings']:,.0f}",
         help="Fewer tickets hitting humans thanks to higher deflection / better first-contact resolution.",
     )
 with col_b:
     st.metric(
         "Revenue preserved from lower churn (est.)",
-        f"${annual_revenue_preserved:,.0f}",
+        f"${roi['preserved']:,.0f}",
     )
 with col_c:
     st.metric(
         "Total annual impact (est.)",
-        f"${total_annual_impact:,.0f}",
+        f"${roi['total']:,.0f}",
     )
 
 # tie back to real evaluated tickets
-history = st.session_state.get("coaching_history", [])
-if history:
-    root_counts_all = Counter(item.get("root_cause", "unknown") for item in history)
-    total_hist = sum(root_counts_all.values())
-    if total_hist > 0:
-        content_share = (
-            root_counts_all.get("content_gap", 0) + root_counts_all.get("mixed", 0)
-        ) / total_hist
-        st.caption(
-            f"In this session, about **{content_share:.0%}** of evaluated tickets surfaced "
-            "documentation or mixed content gaps – exactly where deflection and churn improvements come from."
-        )
+# record_coaching() bumps root_cause_counts once per history entry, so the
+# history length is the tally's total.
+total_hist = len(st.session_state["coaching_history"])
+if total_hist > 0:
+    root_counts_all = st.session_state["root_cause_counts"]
+    content_share = (root_counts_all["content_gap"] + root_counts_all["mixed"]) / total_hist
+    st.caption(
+        f"In this session, about **{content_share:.0%}** of evaluated tickets surfaced "
+        "documentation or mixed content gaps – exactly where deflection and churn improvements come from."
+    )
 
 st.caption(
     "_In production, Ask-AI would plug in real ticket data and historical deflection / NRR numbers. "
@@ -876,7 +1402,7 @@ st.markdown("## 📎 Appendix")
 with st.expander("Raw JSON from the evaluator (for architects / SEs)"):
     result_for_raw = st.session_state.get("last_result")
     if result_for_raw and "error" not in (result_for_raw or {}):
-        st.code(json.dumps(result_for_raw, indent=2), language="json")
+        st.code(result_json(result_for_raw), language="json")
     elif result_for_raw and "error" in result_for_raw:
         st.write("Last call returned an error:")
         st.code(result_for_raw.get("raw_output", ""), language="json")
@@ -888,11 +1414,11 @@ with st.expander("How this plugs into Zendesk in production"):
         "In this demo, tickets are pasted as plain text. In production, tickets would be "
         "ingested directly from Zendesk via webhooks or exports, then normalized."
     )
+    mock_json, normalized_example = mock_zendesk_strings()
     st.markdown("**Example Zendesk-style payload**")
-    st.code(json.dumps(MOCK_ZENDESK_TICKET, indent=2), language="json")
+    st.code(mock_json, language="json")
 
     st.markdown("**Normalized transcript fed into the QA engine**")
-    normalized_example = normalize_zendesk_ticket(MOCK_ZENDESK_TICKET)
     st.code(normalized_example, language="text")
 
     st.markdown(